@@ -1,22 +1,36 @@
 import os
+import re
 import logging
-from datetime import datetime
-from decimal import Decimal
-
-from flask import Flask, jsonify, request
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask.json.provider import JSONProvider
+from flask_caching import Cache
+import orjson
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import conversions
+from pymysql.cursors import DictCursor, SSCursor
+from dbutils.pooled_db import PooledDB
+import msgspec
 
 from dotenv import load_dotenv
 
 # -----------------------------------------------------------------------------
 # Config & Logging
 # -----------------------------------------------------------------------------
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+# load .env first so LOG_LEVEL (and everything below) can be set there
+load_dotenv()
 
-logging.info("Loading variables from environment")
+# INFO in production; set LOG_LEVEL=DEBUG to see per-query connection logs
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(message)s",
+)
 
-load_dotenv()
+logging.info("Loaded variables from environment")
 
 # DB config from env
 DB_HOST = os.getenv("DB_HOST")
@@ -27,49 +41,140 @@ DB_SSL_CA = os.getenv(
     "DB_SSL_CA", "./combined-ca-certificates.pem"
 )  # optional; can be None
 
+# Pool sizing: DB_POOL_MAX bounds how many requests can wait on MySQL at once,
+# so keep it at least as large as the number of worker threads per process.
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 5))  # opened at start-up
+DB_POOL_MAX_IDLE = int(os.getenv("DB_POOL_MAX_IDLE", 10))  # kept open when idle
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))  # hard cap on open connections
+# 1 = ping when a connection is checked out, 0 = never. The ping is the only
+# thing that catches connections MySQL dropped after sitting idle past wait_timeout.
+DB_POOL_PING = int(os.getenv("DB_POOL_PING", 1))
+# reopen a connection after this many queries (0 = never) so busy connections
+# don't pile up server-side state; it counts queries, not time, so it does
+# nothing for idle connections or wait_timeout
+DB_POOL_MAXUSAGE = int(os.getenv("DB_POOL_MAXUSAGE", 0))
+# Streamed responses hold a connection until the client has read the whole
+# body, so only DB_STREAM_MAX of them may run at once; a request that can't get
+# a slot within DB_STREAM_WAIT seconds gets a 503 instead of starving the pool.
+DB_STREAM_MAX = int(os.getenv("DB_STREAM_MAX", max(1, DB_POOL_MAX // 2)))
+DB_STREAM_WAIT = float(os.getenv("DB_STREAM_WAIT", 5))  # seconds
+
+# Shared cache for rarely-changing reads; falls back to per-process memory
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_TIMEOUT = int(os.getenv("CACHE_TIMEOUT", 30))  # seconds
+
+
+# -----------------------------------------------------------------------------
+# JSON (orjson handles datetimes natively; DECIMALs are decoded as floats)
+# -----------------------------------------------------------------------------
+class OrJSONProvider(JSONProvider):
+    # seconds precision; naive datetimes from MySQL are UTC
+    option = orjson.OPT_NAIVE_UTC | orjson.OPT_OMIT_MICROSECONDS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def mysql_datetime_json(value):
+    """
+    Render a 'YYYY-MM-DD HH:MM:SS' string as OrJSONProvider renders the
+    naive UTC datetime MySQL returns for it; keep in step with option above.
+    """
+    return value.replace(" ", "T") + "+00:00"
+
+
 app = Flask(__name__)
+app.json = OrJSONProvider(app)
+cache = Cache(
+    app,
+    config={
+        "CACHE_TYPE": "RedisCache" if REDIS_URL else "SimpleCache",
+        "CACHE_REDIS_URL": REDIS_URL,
+        "CACHE_DEFAULT_TIMEOUT": CACHE_TIMEOUT,
+    },
+)
+
+
+# -----------------------------------------------------------------------------
+# Connection pool (shared by every request in the process)
+# -----------------------------------------------------------------------------
+# decode DECIMAL columns straight to float instead of allocating Decimals
+DB_CONVERSIONS = {
+    **conversions,
+    FIELD_TYPE.DECIMAL: float,
+    FIELD_TYPE.NEWDECIMAL: float,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Create the process-wide connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PooledDB(
+                    creator=pymysql,
+                    mincached=DB_POOL_MIN,
+                    maxcached=DB_POOL_MAX_IDLE,
+                    maxconnections=DB_POOL_MAX,
+                    blocking=True,  # wait for a free connection instead of failing
+                    ping=DB_POOL_PING,
+                    maxusage=DB_POOL_MAXUSAGE or None,
+                    host=DB_HOST,
+                    user=DB_USER,
+                    password=DB_PASS,
+                    db=DB_NAME,
+                    ssl={"ca": DB_SSL_CA} if os.path.exists(DB_SSL_CA) else None,
+                    cursorclass=DictCursor,
+                    conv=DB_CONVERSIONS,
+                    autocommit=False,  # we control commits on writes
+                    charset="utf8mb4",
+                )
+    return _pool
+
+
+def reset_pool():
+    """Drop the pool so the next request builds a fresh one (used after fork)."""
+    global _pool
+    _pool = None
 
 
 # -----------------------------------------------------------------------------
 # DB helper (modeled on your class, with a few safety tweaks)
 # -----------------------------------------------------------------------------
+_stream_slots = threading.BoundedSemaphore(DB_STREAM_MAX)
+
+
+class StreamsBusy(Exception):
+    """All DB_STREAM_MAX streaming slots stayed taken for DB_STREAM_WAIT seconds."""
+
+
 class DB:
-    def __init__(self, host, username, password, dbname, ssl_ca=None):
-        self.host = host
-        self.username = username
-        self.password = password
-        self.dbname = dbname
-        self.ssl = {"ca": ssl_ca} if ssl_ca else None
+    def __init__(self, pool):
+        self.pool = pool
         self.conn = None
 
     def __connect__(self):
-        """Connect (or reconnect) to MySQL."""
+        """Borrow a connection from the pool."""
         try:
-            if self.conn is None or not self.conn.open:
-                self.conn = pymysql.connect(
-                    host=self.host,
-                    user=self.username,
-                    password=self.password,
-                    db=self.dbname,
-                    ssl=self.ssl,
-                    cursorclass=DictCursor,
-                    autocommit=False,  # we control commits on writes
-                    charset="utf8mb4",
-                )
-            else:
-                # ensure connection is alive
-                self.conn.ping(reconnect=True)
-            logging.info("DB connected")
+            self.conn = self.pool.connection()
+            logging.debug("DB connected")
         except pymysql.Error as e:
-            logging.error(f"Error connecting to the database: {e}")
+            logging.error("Error connecting to the database: %s", e)
             raise
 
     def __disconnect__(self):
-        """Close connection."""
+        """Return the connection to the pool."""
         try:
             if self.conn is not None:
                 self.conn.close()
-                logging.info("DB disconnected")
+                logging.debug("DB disconnected")
         finally:
             self.conn = None
 
@@ -96,6 +201,44 @@ class DB:
         finally:
             self.__disconnect__()
 
+    def stream(self, query, params=None):
+        """
+        Run query on an unbuffered (server-side) cursor and return a generator
+        of its rows as plain tuples; select explicit columns to know their order.
+        The query runs before this returns, so connection and SQL errors raise
+        here rather than halfway through a response. The connection is then
+        held until the generator is exhausted or closed, so keep this for large
+        result sets; small ones should use fetch_all.
+        Raises StreamsBusy if no streaming slot frees up in time.
+        """
+        if not _stream_slots.acquire(timeout=DB_STREAM_WAIT):
+            raise StreamsBusy()
+        cur = None
+        try:
+            self.__connect__()
+            cur = self.conn.cursor(SSCursor)
+            cur.execute(query, params or ())
+        except Exception:
+            if cur is not None:
+                cur.close()
+            self.__disconnect__()
+            _stream_slots.release()
+            raise
+        rows = self._iter_rows(cur)
+        next(rows)  # start it, so close() always runs the cleanup below
+        return rows
+
+    def _iter_rows(self, cur):
+        try:
+            yield
+            yield from iter(cur.fetchone, None)
+        finally:
+            try:
+                cur.close()
+            finally:
+                self.__disconnect__()
+                _stream_slots.release()
+
     def execute(self, query, params=None):
         """
         Execute write (INSERT/UPDATE/DELETE). Returns (rowcount, lastrowid).
@@ -113,39 +256,109 @@ class DB:
         finally:
             self.__disconnect__()
 
+    def execute_and_fetch(self, write_query, write_params, read_query, read_params):
+        """
+        Execute a write and read a row back on the same connection.
+        Returns (rowcount, row); the row is None when nothing was written.
+        Commits on success, rolls back on failure.
+        """
+        self.__connect__()
+        try:
+            # an explicit transaction stops DBUtils from silently moving the
+            # read back to a fresh connection and dropping the write
+            self.conn.begin()
+            with self.conn.cursor() as cur:
+                cur.execute(write_query, write_params or ())
+                rowcount = cur.rowcount
+                row = None
+                if rowcount:
+                    cur.execute(read_query, read_params or ())
+                    row = cur.fetchone()
+                self.conn.commit()
+                return rowcount, row
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.__disconnect__()
+
+    def execute_many(self, query, seq_params, chunk_size=1000):
+        """
+        Execute a write once per params tuple, chunk_size rows per statement
+        (PyMySQL turns INSERT ... VALUES into a multi-row insert).
+        Returns (rowcount, lastrowid of the first row).
+        Commits once on success, rolls back on failure.
+        """
+        self.__connect__()
+        try:
+            # explicit transaction: DBUtils must not retry a later chunk on a
+            # fresh connection after the earlier chunks were lost with the old one
+            self.conn.begin()
+            rowcount, first_id = 0, None
+            with self.conn.cursor() as cur:
+                for i in range(0, len(seq_params), chunk_size):
+                    cur.executemany(query, seq_params[i : i + chunk_size])
+                    rowcount += cur.rowcount
+                    if first_id is None:
+                        first_id = cur.lastrowid
+            self.conn.commit()
+            return rowcount, first_id
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.__disconnect__()
+
 
-# Instantiate a reusable factory (fresh connection per call)
+# Instantiate a reusable factory (connections are borrowed from the pool per call)
 def get_db():
-    return DB(
-        DB_HOST,
-        DB_USER,
-        DB_PASS,
-        DB_NAME,
-        ssl_ca=DB_SSL_CA if os.path.exists(DB_SSL_CA) else None,
-    )
+    return DB(get_pool())
 
 
 # -----------------------------------------------------------------------------
-# Utilities
+# SQL & field lists (built once at import, not per request)
 # -----------------------------------------------------------------------------
-def as_json(row_or_rows):
-    """Convert Decimals to float and datetimes to ISO strings for clean JSON."""
-
-    def convert_value(v):
-        if isinstance(v, Decimal):
-            return float(v)
-        if isinstance(v, datetime):
-            # seconds precision; assume UTC
-            return v.isoformat(sep=" ", timespec="seconds")
-        return v
-
-    if row_or_rows is None:
-        return None
-    if isinstance(row_or_rows, list):
-        return [{k: convert_value(v) for k, v in r.items()} for r in row_or_rows]
-    return {k: convert_value(v) for k, v in row_or_rows.items()}
+SENSOR_COLS = "sensor_id, mac_addr, device_id, device_location"
+SENSOR_REQUIRED = frozenset(("sensor_id", "mac_addr", "device_id", "device_location"))
+SENSOR_UPDATABLE = ("mac_addr", "device_id", "device_location")
+
+Q_LIST_SENSORS = f"SELECT {SENSOR_COLS} FROM sensors ORDER BY sensor_id ASC"
+Q_GET_SENSOR = f"SELECT {SENSOR_COLS} FROM sensors WHERE sensor_id=%s"
+Q_INSERT_SENSOR = f"INSERT INTO sensors ({SENSOR_COLS}) VALUES (%s, %s, %s, %s)"
+
+# temperature_log fields clients send, in Q_INSERT_LOG order (after read_time);
+# the POST and PUT body schemas below are both built from this one table
+LOG_FIELDS = {"sensor_id": int, "temperature_f": float, "humidity": float, "pressure": float}
+
+# POST /api/v1/temperatures body (and each item of /batch); read_time is optional
+TempLog = msgspec.defstruct("TempLog", [*LOG_FIELDS.items(), ("read_time", str | None, None)])
+# PUT /api/v1/temperatures/<log_id> body; every field is optional
+TempLogPatch = msgspec.defstruct(
+    "TempLogPatch",
+    [("read_time", str | None, None)]
+    + [(col, typ | None, None) for col, typ in LOG_FIELDS.items()],
+)
+
+# positional order of the tuples streamed by list_temperatures
+LOG_COLS = ("log_id", "read_time", "sensor_id", "temperature_f", "humidity", "pressure")
+
+Q_LIST_LOGS = (
+    f"SELECT {', '.join(LOG_COLS)} FROM temperature_log "
+    "WHERE log_id < %s ORDER BY log_id DESC LIMIT %s"
+)
+Q_GET_LOG = "SELECT * FROM temperature_log WHERE log_id=%s"
+Q_INSERT_LOG = """
+    INSERT INTO temperature_log (read_time, sensor_id, temperature_f, humidity, pressure)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+Q_DELETE_LOG = "DELETE FROM temperature_log WHERE log_id=%s"
+
+Q_HEALTH = "SELECT 1 as ok"
 
 
+# -----------------------------------------------------------------------------
+# Utilities
+# -----------------------------------------------------------------------------
 def bad_request(message, code=400):
     return jsonify({"error": {"code": code, "message": message}}), code
 
@@ -153,7 +366,89 @@ def bad_request(message, code=400):
 def require_json():
     if not request.is_json:
         return None, bad_request("Content-Type must be application/json", 415)
-    return request.get_json(silent=True) or {}, None
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return None, bad_request("Body must be a JSON object")
+    return data, None
+
+
+def wants_minimal():
+    """?return=minimal: the client only needs the status, not the updated row."""
+    return request.args.get("return") == "minimal"
+
+
+def decode_json(schema):
+    """Like require_json, but parse and type-check the body against a msgspec type in one pass."""
+    if not request.is_json:
+        return None, bad_request("Content-Type must be application/json", 415)
+    try:
+        return msgspec.json.decode(request.get_data(), type=schema, strict=False), None
+    except msgspec.ValidationError as e:
+        return None, bad_request(str(e))
+    except msgspec.DecodeError:
+        return None, bad_request("Body must be valid JSON")
+
+
+# the common 'YYYY-MM-DD HH:MM:SS' shape is passed to MySQL as-is (it parses it anyway);
+# each field is range-checked so bad dates are rejected here, not by MySQL
+_RT_RE = re.compile(
+    r"[1-9]\d{3}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])[ T]([01]\d|2[0-3]):[0-5]\d:[0-5]\d",
+    re.ASCII,
+)
+_T_TO_SPACE = str.maketrans("T", " ")
+
+
+def parse_read_time(value):
+    """
+    Validate an ISO-like read_time; raises ValueError if it isn't one.
+    Returns a 'YYYY-MM-DD HH:MM:SS' string for the common case and only
+    falls back to a datetime for other ISO forms (fractions, offsets, ...).
+    That datetime is naive UTC with whole seconds, i.e. exactly what a
+    DATETIME column will store, so it can be echoed back as-is.
+    """
+    if not isinstance(value, str):
+        raise ValueError("read_time must be a string")
+    m = _RT_RE.fullmatch(value)
+    if m:
+        if int(m[2]) > 28:
+            # only the month's length is left to check (e.g. 2025-02-30)
+            datetime(int(value[:4]), int(m[1]), int(m[2]))
+        return value.translate(_T_TO_SPACE)
+    dt = datetime.fromisoformat(value.replace("T", " "))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    if dt.microsecond:
+        # DATETIME rounds fractional seconds to the nearest second
+        try:
+            dt = dt.replace(microsecond=0) + timedelta(seconds=dt.microsecond >= 500_000)
+        except OverflowError:
+            raise ValueError("read_time is out of range") from None
+    return dt
+
+
+def stream_temperatures(rows, limit, columnar=False, chunk_rows=100):
+    """
+    Write the list_temperatures payload as LOG_COLS-ordered tuples arrive,
+    chunk_rows at a time, instead of building the whole list in memory first.
+    columnar=True sends {"columns": [...], "rows": [[...], ...]} instead of
+    one object per row, which is noticeably smaller on the wire.
+    """
+    if columnar:
+        yield '{"columns":' + app.json.dumps(LOG_COLS) + ',"rows":['
+    else:
+        yield '{"temperatures":['
+    buf, count, last_id = [], 0, None
+    for row in rows:
+        item = row if columnar else dict(zip(LOG_COLS, row))
+        buf.append(("," if count else "") + app.json.dumps(item))
+        count += 1
+        last_id = row[0]  # log_id
+        if len(buf) == chunk_rows:
+            yield "".join(buf)
+            buf = []
+    # a short page means there is nothing older left
+    next_before_id = last_id if count == limit else None
+    yield "".join(buf) + '],"next_before_id":' + app.json.dumps(next_before_id) + "}"
 
 # -----------------------------------------------------------------------------
 # Home
@@ -167,39 +462,60 @@ def home():
 # -----------------------------------------------------------------------------
 # Health
 # -----------------------------------------------------------------------------
+# probes hit this every few seconds; only re-check the DB once the result is stale
+HEALTH_TTL = 5  # seconds
+_HEALTH = {"ts": float("-inf"), "status": "ok"}
+
+
 @app.get("/api/v1/health")
 def health():
-    # optional: check DB
-    try:
-        db = get_db()
-        db.fetch_one("SELECT 1 as ok")
+    now = time.monotonic()
+    if now - _HEALTH["ts"] >= HEALTH_TTL:
+        # optional: check DB
+        try:
+            db = get_db()
+            db.fetch_one(Q_HEALTH)
+            status = "ok"
+        except Exception:
+            status = "degraded"
+        _HEALTH.update(ts=now, status=status)
+
+    if _HEALTH["status"] == "ok":
         return jsonify({"status": "ok"})
-    except Exception:
-        return jsonify({"status": "degraded"}), 503
+    return jsonify({"status": "degraded"}), 503
 
 
 # -----------------------------------------------------------------------------
 # SENSORS
 # -----------------------------------------------------------------------------
+# sensors rarely change, so reads are cached and writes below invalidate them
+@cache.memoize()
+def fetch_sensors():
+    return get_db().fetch_all(Q_LIST_SENSORS)
+
+
+@cache.memoize()
+def fetch_sensor(sensor_id):
+    return get_db().fetch_one(Q_GET_SENSOR, (sensor_id,))
+
+
+def forget_sensor(sensor_id):
+    cache.delete_memoized(fetch_sensors)
+    cache.delete_memoized(fetch_sensor, sensor_id)
+
+
 @app.get("/api/v1/sensors")
 def list_sensors():
-    db = get_db()
-    rows = db.fetch_all(
-        "SELECT sensor_id, mac_addr, device_id, device_location FROM sensors ORDER BY sensor_id ASC"
-    )
-    return jsonify(as_json(rows))
+    rows = fetch_sensors()
+    return jsonify(rows)
 
 
 @app.get("/api/v1/sensors/<int:sensor_id>")
 def get_sensor(sensor_id: int):
-    db = get_db()
-    row = db.fetch_one(
-        "SELECT sensor_id, mac_addr, device_id, device_location FROM sensors WHERE sensor_id=%s",
-        (sensor_id,),
-    )
+    row = fetch_sensor(sensor_id)
     if not row:
         return bad_request(f"Sensor {sensor_id} not found", 404)
-    return jsonify(as_json(row))
+    return jsonify(row)
 
 
 @app.post("/api/v1/sensors")
@@ -207,30 +523,24 @@ def create_sensor():
     data, err = require_json()
     if err:
         return err
-    required = ["sensor_id", "mac_addr", "device_id", "device_location"]
-    missing = [k for k in required if k not in data]
+    missing = SENSOR_REQUIRED - data.keys()
     if missing:
-        return bad_request(f"Missing fields: {', '.join(missing)}")
+        return bad_request(f"Missing fields: {', '.join(sorted(missing))}")
 
     try:
         db = get_db()
-        q = """
-            INSERT INTO sensors (sensor_id, mac_addr, device_id, device_location)
-            VALUES (%s, %s, %s, %s)
-        """
         params = (
             int(data["sensor_id"]),
             data["mac_addr"],
             data["device_id"],
             data["device_location"],
         )
-        db.execute(q, params)
-        # read back
-        created = get_db().fetch_one(
-            "SELECT sensor_id, mac_addr, device_id, device_location FROM sensors WHERE sensor_id=%s",
-            (int(data["sensor_id"]),),
+        # read back on the same connection
+        _, created = db.execute_and_fetch(
+            Q_INSERT_SENSOR, params, Q_GET_SENSOR, (params[0],)
         )
-        return jsonify({"message": "sensor created", "sensor": as_json(created)}), 201
+        forget_sensor(params[0])
+        return jsonify({"message": "sensor created", "sensor": created}), 201
     except pymysql.err.IntegrityError as e:
         return bad_request(f"Integrity error: {e.args[1]}")
     except Exception as e:
@@ -246,7 +556,7 @@ def update_sensor(sensor_id: int):
 
     fields = []
     params = []
-    for k in ("mac_addr", "device_id", "device_location"):
+    for k in SENSOR_UPDATABLE:
         if k in data:
             fields.append(f"{k}=%s")
             params.append(data[k])
@@ -259,14 +569,16 @@ def update_sensor(sensor_id: int):
     try:
         db = get_db()
         q = f"UPDATE sensors SET {', '.join(fields)} WHERE sensor_id=%s"
-        rc, _ = db.execute(q, tuple(params))
+        if wants_minimal():
+            rc, _ = db.execute(q, tuple(params))
+        else:
+            rc, updated = db.execute_and_fetch(q, tuple(params), Q_GET_SENSOR, (sensor_id,))
         if rc == 0:
             return bad_request(f"Sensor {sensor_id} not found", 404)
-        updated = get_db().fetch_one(
-            "SELECT sensor_id, mac_addr, device_id, device_location FROM sensors WHERE sensor_id=%s",
-            (sensor_id,),
-        )
-        return jsonify({"message": "sensor updated", "sensor": as_json(updated)})
+        forget_sensor(sensor_id)
+        if wants_minimal():
+            return "", 204
+        return jsonify({"message": "sensor updated", "sensor": updated})
     except Exception:
         logging.exception("Update sensor failed")
         return bad_request("Failed to update sensor")
@@ -289,46 +601,35 @@ def create_temperature():
       "read_time": "2025-09-24 13:05:00"  # optional; UTC recommended
     }
     """
-    data, err = require_json()
+    log, err = decode_json(TempLog)
     if err:
         return err
 
-    required = ["sensor_id", "temperature_f", "humidity", "pressure"]
-    missing = [k for k in required if k not in data]
-    if missing:
-        return bad_request(f"Missing fields: {', '.join(missing)}")
-
     # parse read_time (optional)
-    read_time = data.get("read_time")
-    if read_time:
+    if log.read_time:
         try:
-            read_time = read_time.replace("T", " ")
-            dt = datetime.fromisoformat(read_time)
-        except Exception:
+            dt = parse_read_time(log.read_time)
+        except ValueError:
             return bad_request(
                 "read_time must be ISO-like (e.g., '2025-09-24 13:05:00')"
             )
     else:
-        dt = datetime.utcnow()
+        # whole seconds, so the echoed value matches what DATETIME stores
+        dt = datetime.utcnow().replace(microsecond=0)
+
+    values = tuple(getattr(log, col) for col in LOG_FIELDS)
 
     try:
         db = get_db()
-        q = """
-            INSERT INTO temperature_log (read_time, sensor_id, temperature_f, humidity, pressure)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        params = (
-            dt,
-            int(data["sensor_id"]),
-            float(data["temperature_f"]),
-            float(data["humidity"]),
-            float(data["pressure"]),
-        )
-        _, last_id = db.execute(q, params)
-        created = get_db().fetch_one(
-            "SELECT * FROM temperature_log WHERE log_id=%s", (last_id,)
-        )
-        return jsonify({"message": "log created", "log": as_json(created)}), 201
+        _, last_id = db.execute(Q_INSERT_LOG, (dt, *values))
+        # no read back: everything but log_id is already known
+        created = {
+            "log_id": last_id,
+            # match how datetimes read from MySQL are serialized
+            "read_time": dt if isinstance(dt, datetime) else mysql_datetime_json(dt),
+            **dict(zip(LOG_FIELDS, values)),
+        }
+        return jsonify({"message": "log created", "log": created}), 201
     except pymysql.err.IntegrityError as e:
         # likely FK violation on sensor_id
         return bad_request(f"Integrity error: {e.args[1]}")
@@ -337,78 +638,107 @@ def create_temperature():
         return bad_request("Failed to create log")
 
 
+@app.post("/api/v1/temperatures/batch")
+def create_temperatures_batch():
+    """
+    JSON: a list of logs, each shaped like the POST /api/v1/temperatures body
+    [
+      {"sensor_id": 0, "temperature_f": 72.5, "humidity": 44.3, "pressure": 995.2,
+       "read_time": "2025-09-24 13:05:00"},
+      ...
+    ]
+    """
+    logs, err = decode_json(list[TempLog])
+    if err:
+        return err
+    if not logs:
+        return bad_request("Body must be a non-empty JSON array of logs")
+
+    params = []
+    for i, log in enumerate(logs):
+        try:
+            if log.read_time:
+                dt = parse_read_time(log.read_time)
+            else:
+                dt = datetime.utcnow().replace(microsecond=0)
+        except ValueError:
+            return bad_request(
+                f"Log {i}: read_time must be ISO-like (e.g., '2025-09-24 13:05:00')"
+            )
+        params.append((dt, *(getattr(log, col) for col in LOG_FIELDS)))
+
+    try:
+        db = get_db()
+        inserted, first_id = db.execute_many(Q_INSERT_LOG, params)
+        return (
+            jsonify({"message": "logs created", "inserted": inserted, "first_id": first_id}),
+            201,
+        )
+    except pymysql.err.IntegrityError as e:
+        # likely FK violation on sensor_id; nothing from the batch is kept
+        return bad_request(f"Integrity error: {e.args[1]}")
+    except Exception:
+        logging.exception("Create log batch failed")
+        return bad_request("Failed to create logs")
+
+
 @app.get("/api/v1/temperatures")
 def list_temperatures():
+    """
+    Newest logs first, paginated by key instead of OFFSET:
+    pass the previous page's next_before_id as ?before_id= to get the next one.
+    ?format=columnar returns column names once plus a list of row arrays.
+    """
     try:
-        limit = min(int(request.args.get("limit", 100)), 1000)
-        offset = int(request.args.get("offset", 0))
+        limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+        before_id = int(request.args.get("before_id", 2**63 - 1))
     except ValueError:
-        return bad_request("limit and offset must be integers")
+        return bad_request("limit and before_id must be integers")
+    columnar = request.args.get("format") == "columnar"
 
     db = get_db()
-    rows = db.fetch_all(
-        "SELECT * FROM temperature_log ORDER BY log_id DESC LIMIT %s OFFSET %s",
-        (limit, offset),
+    try:
+        rows = db.stream(Q_LIST_LOGS, (before_id, limit))
+    except StreamsBusy:
+        return bad_request("Too many log listings in progress; retry shortly", 503)
+    response = Response(
+        stream_with_context(stream_temperatures(rows, limit, columnar)),
+        mimetype="application/json",
     )
-    return jsonify(as_json(rows))
+    # hand the connection back even if the client goes away mid-body
+    response.call_on_close(rows.close)
+    return response
 
 
 @app.get("/api/v1/temperatures/<int:log_id>")
 def get_log(log_id: int):
     db = get_db()
-    row = db.fetch_one("SELECT * FROM temperature_log WHERE log_id=%s", (log_id,))
+    row = db.fetch_one(Q_GET_LOG, (log_id,))
     if not row:
         return bad_request(f"log {log_id} not found", 404)
-    return jsonify(as_json(row))
+    return jsonify(row)
 
 
 @app.put("/api/v1/temperatures/<int:log_id>")
 def update_log(log_id: int):
-    data, err = require_json()
+    patch, err = decode_json(TempLogPatch)
     if err:
         return err
 
     sets = []
     params = []
-
-    if "read_time" in data:
-        try:
-            rt = data["read_time"].replace("T", " ")
-            dt = datetime.fromisoformat(rt)
-            sets.append("read_time=%s")
-            params.append(dt)
-        except Exception:
-            return bad_request(
-                "read_time must be ISO-like (e.g., '2025-09-24 13:05:00')"
-            )
-
-    if "sensor_id" in data:
-        sets.append("sensor_id=%s")
-        try:
-            params.append(int(data["sensor_id"]))
-        except ValueError:
-            return bad_request("sensor_id must be an integer")
-
-    if "temperature_f" in data:
-        sets.append("temperature_f=%s")
-        try:
-            params.append(float(data["temperature_f"]))
-        except ValueError:
-            return bad_request("temperature_f must be a number")
-
-    if "humidity" in data:
-        sets.append("humidity=%s")
-        try:
-            params.append(float(data["humidity"]))
-        except ValueError:
-            return bad_request("humidity must be a number")
-
-    if "pressure" in data:
-        sets.append("pressure=%s")
-        try:
-            params.append(float(data["pressure"]))
-        except ValueError:
-            return bad_request("pressure must be a number")
+    for col, value in msgspec.structs.asdict(patch).items():
+        if value is None:
+            continue
+        if col == "read_time":
+            try:
+                value = parse_read_time(value)
+            except ValueError:
+                return bad_request(
+                    "read_time must be ISO-like (e.g., '2025-09-24 13:05:00')"
+                )
+        sets.append(f"{col}=%s")
+        params.append(value)
 
     if not sets:
         return bad_request("No updatable fields provided")
@@ -418,13 +748,15 @@ def update_log(log_id: int):
     try:
         db = get_db()
         q = f"UPDATE temperature_log SET {', '.join(sets)} WHERE log_id=%s"
-        rc, _ = db.execute(q, tuple(params))
+        if wants_minimal():
+            rc, _ = db.execute(q, tuple(params))
+        else:
+            rc, updated = db.execute_and_fetch(q, tuple(params), Q_GET_LOG, (log_id,))
         if rc == 0:
             return bad_request(f"log {log_id} not found", 404)
-        updated = get_db().fetch_one(
-            "SELECT * FROM temperature_log WHERE log_id=%s", (log_id,)
-        )
-        return jsonify({"message": "log updated", "log": as_json(updated)})
+        if wants_minimal():
+            return "", 204
+        return jsonify({"message": "log updated", "log": updated})
     except pymysql.err.IntegrityError as e:
         return bad_request(f"Integrity error: {e.args[1]}")
     except Exception:
@@ -436,17 +768,17 @@ def update_log(log_id: int):
 def delete_log(log_id: int):
     try:
         db = get_db()
-        rc, _ = db.execute("DELETE FROM temperature_log WHERE log_id=%s", (log_id,))
+        rc, _ = db.execute(Q_DELETE_LOG, (log_id,))
         if rc == 0:
             return bad_request(f"log {log_id} not found", 404)
-        return jsonify({"message": "log deleted", "log_id": log_id})
+        return "", 204
     except Exception:
         logging.exception("Delete log failed")
         return bad_request("Failed to delete log")
 
 
 # -----------------------------------------------------------------------------
-# Main
+# Main (local development only; production runs under gunicorn, see gunicorn.conf.py)
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5003, debug=False)
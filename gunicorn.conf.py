@@ -0,0 +1,21 @@
+# Production server settings; gunicorn picks this file up automatically:
+#   gunicorn app:app
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5003')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))  # keep <= DB_POOL_MAX
+# SO_REUSEPORT on the one listening socket (all workers share it, so this does no
+# per-worker balancing); it lets a new gunicorn bind the port while the old one
+# is still running, e.g. during a restart
+reuse_port = True
+preload_app = True
+
+
+def post_fork(server, worker):
+    # each worker needs its own DB connections, never ones opened before the fork
+    from app import reset_pool
+
+    reset_pool()